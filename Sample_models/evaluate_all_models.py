@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import pickle
 import time
-import psutil, os, threading
+import psutil, os, sys, threading
 from pathlib import Path
 from sklearn.metrics import (
     accuracy_score,
@@ -13,6 +13,9 @@ from sklearn.metrics import (
 )
 from sklearn.preprocessing import LabelBinarizer
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from instrumentation import stage, count
+
 # ─── CONFIG ────────────────────────────────────────────────────────────────────
 TEST_CSV      = './normal/merged_labeled_Faultdata_v1.csv'
 MODELS_DIR    = Path('.')            # put model_v3.pkl, svm_model_v1.pkl, mlp_model_v1.pkl, etc. here
@@ -20,7 +23,8 @@ OUT_DIR       = Path('models_comparison')
 OUT_DIR.mkdir(exist_ok=True)
 
 # ─── LOAD TEST SET ─────────────────────────────────────────────────────────────
-df        = pd.read_csv(TEST_CSV)
+with stage('evaluate_all.load_data', path=TEST_CSV):
+    df    = pd.read_csv(TEST_CSV)
 X_test    = df.drop(columns=['label'])
 y_true    = df['label'].astype(str)
 labels    = sorted(y_true.unique())
@@ -35,16 +39,18 @@ def evaluate_model(model_path):
     print(f"\n▶ Evaluating {name} …")
 
     # Load
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
+    with stage('evaluate_all.load_model', model=name):
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
 
     # Warm-up
     _ = model.predict(X_test.iloc[:10])
 
     # Measure latency
-    start = time.perf_counter()
-    y_pred = model.predict(X_test)
-    latency_s = time.perf_counter() - start
+    with stage('evaluate_all.predict', model=name, rows=len(X_test)):
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        latency_s = time.perf_counter() - start
     ms_per_sample = latency_s / len(X_test) * 1e3
 
     # Profile CPU & memory
@@ -78,10 +84,11 @@ def evaluate_model(model_path):
 
     # Per-class ROC-AUC & AP
     if hasattr(model, 'predict_proba'):
-        y_proba = model.predict_proba(X_test)
-        for i, cls in enumerate(lb.classes_):
-            metrics[f'roc_auc_{cls}'] = roc_auc_score(y_onehot[:, i], y_proba[:, i])
-            metrics[f'ap_{cls}']      = average_precision_score(y_onehot[:, i], y_proba[:, i])
+        with stage('evaluate_all.curves', model=name):
+            y_proba = model.predict_proba(X_test)
+            for i, cls in enumerate(lb.classes_):
+                metrics[f'roc_auc_{cls}'] = roc_auc_score(y_onehot[:, i], y_proba[:, i])
+                metrics[f'ap_{cls}']      = average_precision_score(y_onehot[:, i], y_proba[:, i])
 
     # Save per-model confusion matrix
     cm = confusion_matrix(y_true, y_pred, labels=labels)
@@ -95,7 +102,9 @@ def evaluate_model(model_path):
 # ─── MAIN LOOP ─────────────────────────────────────────────────────────────────
 all_metrics = []
 for model_file in MODELS_DIR.glob('*.pkl'):
-    all_metrics.append(evaluate_model(model_file))
+    with stage('evaluate_all.model', model=model_file.stem):
+        all_metrics.append(evaluate_model(model_file))
+        count('models')
 
 # ─── AGGREGATE & SAVE TRADE-OFF TABLE ──────────────────────────────────────────
 metrics_df = pd.DataFrame(all_metrics)
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import argparse
+import sys
 import pandas as pd
 import pickle
 from pathlib import Path
@@ -13,8 +15,20 @@ from sklearn.metrics import (
     confusion_matrix
 )
 
+# drift monitor and instrumentation live next to the evaluator
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from drift_monitor import build_reference_profile, save_reference_profile
+from instrumentation import stage, count
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--input', default='./normal/merged_labeled_Faultdata_v1.csv',
+                    help="labelled CSV with feature columns plus 'label' (default: %(default)s)")
+args = parser.parse_args()
+
 # ─── 1) Load Data ─────────────────────────────────────────────────────────────
-df = pd.read_csv('./normal/merged_labeled_Faultdata_v1.csv')
+with stage('mlp.load', path=args.input):
+    df = pd.read_csv(args.input)
+    count('rows', len(df))
 X = df.drop(columns=['label'])
 y = df['label']
 
@@ -50,7 +64,8 @@ grid_search = GridSearchCV(
 
 # ─── 4) Run Grid Search on Training Data ──────────────────────────────────────
 print("Starting hyperparameter search for MLPClassifier...")
-grid_search.fit(X_train, y_train)
+with stage('mlp.grid_search', rows=len(X_train)):
+    grid_search.fit(X_train, y_train)
 
 best_params = grid_search.best_params_
 best_score  = grid_search.best_score_
@@ -64,7 +79,8 @@ print(f"\nBest cross-validated score (training): {best_score:.4f}\n")
 best_mlp = grid_search.best_estimator_
 
 # ─── 5) Evaluate on Test Set ──────────────────────────────────────────────────
-y_pred = best_mlp.predict(X_test)
+with stage('mlp.evaluate', rows=len(X_test)):
+    y_pred = best_mlp.predict(X_test)
 
 print("Confusion Matrix (test set):")
 print(confusion_matrix(y_test, y_pred))
@@ -73,7 +89,17 @@ print("\nClassification Report (test set):")
 print(classification_report(y_test, y_pred, digits=4))
 
 # ─── 6) Save the Best Model ───────────────────────────────────────────────────
-with open('mlp_model.pkl', 'wb') as f_out:
-    pickle.dump(best_mlp, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+with stage('mlp.save'):
+    with open('mlp_model.pkl', 'wb') as f_out:
+        pickle.dump(best_mlp, f_out, protocol=pickle.HIGHEST_PROTOCOL)
 
 print("\nSaved best MLP model to 'mlp_model.pkl'")
+
+# ─── 7) Save Drift Reference Profile ──────────────────────────────────────────
+# features from the training split; confidence from held-out X_test, since
+# in-sample confidence is near 1.0 and would flag healthy traffic as drift
+with stage('mlp.reference_profile'):
+    profile = build_reference_profile(X_train, best_mlp.predict_proba(X_test).max(axis=1))
+    save_reference_profile(profile, 'mlp_model_reference.json')
+
+print("Saved drift reference profile to 'mlp_model_reference.json'")
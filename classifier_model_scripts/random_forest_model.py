@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import argparse
+import sys
 import pandas as pd
 import pickle
 from pathlib import Path
@@ -13,9 +15,21 @@ from sklearn.metrics import (
     confusion_matrix
 )
 
+# drift monitor and instrumentation live next to the evaluator
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from drift_monitor import build_reference_profile, save_reference_profile
+from instrumentation import stage, count
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--input', default='./normal/merged_labeled_Faultdata_v1.csv',
+                    help="labelled CSV with feature columns plus 'label' (default: %(default)s)")
+args = parser.parse_args()
+
 # ─── 1) Load Data ─────────────────────────────────────────────────────────────
-# Assumes 'final_data.csv' has feature columns plus a 'label' column
-df = pd.read_csv('./normal/merged_labeled_Faultdata_v1.csv')
+# Assumes args.input has feature columns plus a 'label' column
+with stage('random_forest.load', path=args.input):
+    df = pd.read_csv(args.input)
+    count('rows', len(df))
 X = df.drop(columns=['label'])
 y = df['label']
 
@@ -51,7 +65,8 @@ grid_search = GridSearchCV(
 
 # ─── 4) Run Grid Search on Training Data ──────────────────────────────────────
 print("Starting hyperparameter search...")
-grid_search.fit(X_train, y_train)
+with stage('random_forest.grid_search', rows=len(X_train)):
+    grid_search.fit(X_train, y_train)
 
 best_params = grid_search.best_params_
 best_score  = grid_search.best_score_
@@ -65,7 +80,8 @@ print(f"\nBest cross-validated F1-macro (training): {best_score:.4f}\n")
 best_rf = grid_search.best_estimator_
 
 # ─── 5) Evaluate on Test Set ──────────────────────────────────────────────────
-y_pred = best_rf.predict(X_test)
+with stage('random_forest.evaluate', rows=len(X_test)):
+    y_pred = best_rf.predict(X_test)
 
 print("Confusion Matrix (test set):")
 print(confusion_matrix(y_test, y_pred))
@@ -74,7 +90,17 @@ print("\nClassification Report (test set):")
 print(classification_report(y_test, y_pred, digits=4))
 
 # ─── 6) Save the Best Model ───────────────────────────────────────────────────
-with open('random_forest_model.pkl', 'wb') as f_out:
-    pickle.dump(best_rf, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+with stage('random_forest.save'):
+    with open('random_forest_model.pkl', 'wb') as f_out:
+        pickle.dump(best_rf, f_out, protocol=pickle.HIGHEST_PROTOCOL)
 
 print("\nSaved best model to 'random_forest_model.pkl'")
+
+# ─── 7) Save Drift Reference Profile ──────────────────────────────────────────
+# features from the training split; confidence from held-out X_test, since
+# in-sample confidence is near 1.0 and would flag healthy traffic as drift
+with stage('random_forest.reference_profile'):
+    profile = build_reference_profile(X_train, best_rf.predict_proba(X_test).max(axis=1))
+    save_reference_profile(profile, 'random_forest_model_reference.json')
+
+print("Saved drift reference profile to 'random_forest_model_reference.json'")
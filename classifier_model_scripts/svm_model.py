@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import argparse
+import sys
 import pandas as pd
 import pickle
 from sklearn.svm import SVC
@@ -6,9 +8,22 @@ from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKF
 from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
+from pathlib import Path
+
+# drift monitor and instrumentation live next to the evaluator
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from drift_monitor import build_reference_profile, save_reference_profile
+from instrumentation import stage, count
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--input', default='./normal/merged_labeled_Faultdata_v1.csv',
+                    help="labelled CSV with feature columns plus 'label' (default: %(default)s)")
+args = parser.parse_args()
 
 # ─── 1) Load Data ─────────────────────────────────────────────────────────────
-df = pd.read_csv('./normal/merged_labeled_Faultdata_v1.csv')
+with stage('svm.load', path=args.input):
+    df = pd.read_csv(args.input)
+    count('rows', len(df))
 X = df.drop(columns=['label'])
 y = df['label']
 
@@ -43,7 +58,8 @@ grid_search = GridSearchCV(
 
 # ─── 4) Run Grid Search ───────────────────────────────────────────────────────
 print("Starting hyperparameter search for SVM...")
-grid_search.fit(X_train, y_train)
+with stage('svm.grid_search', rows=len(X_train)):
+    grid_search.fit(X_train, y_train)
 
 best_model = grid_search.best_estimator_
 print("\nBest parameters found:")
@@ -51,8 +67,9 @@ print(grid_search.best_params_)
 print(f"Best training CV score: {grid_search.best_score_:.4f}")
 
 # ─── 5) Evaluate on Test Set ──────────────────────────────────────────────────
-y_pred = best_model.predict(X_test)
-y_proba = best_model.predict_proba(X_test)
+with stage('svm.evaluate', rows=len(X_test)):
+    y_pred = best_model.predict(X_test)
+    y_proba = best_model.predict_proba(X_test)
 
 print("\nConfusion Matrix (test set):")
 print(confusion_matrix(y_test, y_pred))
@@ -61,7 +78,17 @@ print("\nClassification Report (test set):")
 print(classification_report(y_test, y_pred, digits=4))
 
 # ─── 6) Save the Best Model ───────────────────────────────────────────────────
-with open('svm_model.pkl', 'wb') as f_out:
-    pickle.dump(best_model, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+with stage('svm.save'):
+    with open('svm_model.pkl', 'wb') as f_out:
+        pickle.dump(best_model, f_out, protocol=pickle.HIGHEST_PROTOCOL)
 
 print("\nSaved best SVM model to 'svm_model.pkl'")
+
+# ─── 7) Save Drift Reference Profile ──────────────────────────────────────────
+# features from the training split; confidence from held-out X_test, since
+# in-sample confidence is near 1.0 and would flag healthy traffic as drift
+with stage('svm.reference_profile'):
+    profile = build_reference_profile(X_train, best_model.predict_proba(X_test).max(axis=1))
+    save_reference_profile(profile, 'svm_model_reference.json')
+
+print("Saved drift reference profile to 'svm_model_reference.json'")
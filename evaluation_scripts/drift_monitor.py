@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Streaming drift detection on live NISMon metrics.
+
+Keeps constant-memory sketches (fixed-bin histogram + running mean/variance)
+for each of the 11 live features and for prediction confidence, compares each
+tumbling window of `window` rows against a reference profile saved at training
+time, and emits a retrain signal as soon as a window drifts -- so detection
+latency is bounded by `window` rows.
+
+Usage:
+  # build a reference profile from the training data (+ model for confidence)
+  python drift_monitor.py profile --data train.csv --holdout test.csv \
+      --model ../random_forest_model.pkl --out random_forest_model_reference.json
+
+  # replay a CSV through the monitor, optionally injecting a shift
+  python drift_monitor.py replay --data dataset_testing.csv \
+      --profile random_forest_model_reference.json \
+      --shuffle --shift 'CPU_busy(%)=3.0' --shift-from 1500
+"""
+import argparse
+import json
+import math
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FEATURES = [
+    'PCIRdCur', 'ItoM', 'ItoMCacheNear', 'WiL',
+    'MemRead', 'MemWrite', 'MemTotal',
+    'drop_pct(%)', 'CPU_busy(%)', 'ksoft_avg', 'ksoft_max',
+]
+CONFIDENCE = 'confidence'
+
+# Population Stability Index above which a feature counts as drifted
+# (0.1 = moderate, 0.25 = significant shift in the usual rule of thumb)
+PSI_THRESHOLD = 0.25
+# Shift of the window mean, in reference standard deviations
+MEAN_SHIFT_THRESHOLD = 1.0
+_EPS = 1e-6
+
+# ─── Sketches ────────────────────────────────────────────────────────────────
+class RunningStats:
+    """Incremental count/mean/variance (Welford, batched via Chan et al.)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        n_b = values.size
+        if n_b == 0:
+            return
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def var(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class StreamingHistogram:
+    """
+    Fixed-edge histogram: len(edges) + 1 bins, the outer two open-ended.
+    Memory does not grow with the number of observations.
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.stats = RunningStats()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        idx = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(idx, minlength=self.counts.size)
+        self.stats.update(values)
+
+    @property
+    def n(self):
+        return self.stats.n
+
+    def proportions(self):
+        total = self.counts.sum()
+        if total == 0:
+            return np.zeros(self.counts.size)
+        return self.counts / total
+
+    def quantile(self, q):
+        """Approximate quantile by linear interpolation inside the bin."""
+        total = self.counts.sum()
+        if total == 0:
+            return math.nan
+        lo = np.concatenate(([self.stats.min], self.edges))
+        hi = np.concatenate((self.edges, [self.stats.max]))
+        cum = np.cumsum(self.counts)
+        target = q * total
+        b = int(np.searchsorted(cum, target, side='left'))
+        b = min(b, len(cum) - 1)
+        before = cum[b - 1] if b > 0 else 0
+        frac = (target - before) / self.counts[b] if self.counts[b] else 0.0
+        left, right = max(lo[b], self.stats.min), min(hi[b], self.stats.max)
+        return float(left + frac * (right - left))
+
+    def reset(self):
+        self.counts[:] = 0
+        self.stats = RunningStats()
+
+
+def psi(expected, actual):
+    """Population Stability Index between two binned distributions."""
+    e = np.clip(np.asarray(expected, dtype=float), _EPS, None)
+    a = np.clip(np.asarray(actual, dtype=float), _EPS, None)
+    return float(((a - e) * np.log(a / e)).sum())
+
+# ─── Reference Profile ───────────────────────────────────────────────────────
+def build_reference_profile(X, confidence=None, n_bins=10):
+    """
+    Summarise training data as a JSON-serialisable profile: per column the
+    quantile bin edges, bin proportions, mean and std. `confidence` is the
+    per-row max predict_proba of the trained model on held-out rows (it may
+    have a different length from X); in-sample confidence is inflated and
+    would make healthy live traffic look drifted.
+    """
+    columns = {c: np.asarray(X[c], dtype=float) for c in FEATURES if c in X}
+    if confidence is not None:
+        columns[CONFIDENCE] = np.asarray(confidence, dtype=float)
+
+    qs = np.linspace(0, 1, n_bins + 1)[1:-1]
+    profile = {'n_bins': n_bins, 'columns': {}}
+    for name, values in columns.items():
+        values = values[np.isfinite(values)]
+        edges = np.unique(np.quantile(values, qs)) if values.size else np.array([])
+        hist = StreamingHistogram(edges)
+        hist.update(values)
+        profile['columns'][name] = {
+            'edges': edges.tolist(),
+            'proportions': hist.proportions().tolist(),
+            'mean': hist.stats.mean,
+            'std': hist.stats.std,
+        }
+    return profile
+
+
+def save_reference_profile(profile, path):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_reference_profile(path):
+    with open(path) as f:
+        return json.load(f)
+
+# ─── Monitor ─────────────────────────────────────────────────────────────────
+class DriftMonitor:
+    """
+    Compare tumbling windows of live rows against a reference profile.
+
+    update() returns a list with one report dict per window it closed (empty
+    if none closed), so no window's verdict is lost when a large batch spans
+    several windows. A report has 'retrain' set when at least `min_drifted` columns drifted (PSI above
+    psi_threshold or mean shifted by more than mean_shift_threshold reference
+    standard deviations) for `patience` consecutive windows.
+    """
+
+    def __init__(self, profile, window=1000, psi_threshold=PSI_THRESHOLD,
+                 mean_shift_threshold=MEAN_SHIFT_THRESHOLD, min_drifted=1, patience=1):
+        self.reference = profile['columns']
+        self.window = window
+        self.psi_threshold = psi_threshold
+        self.mean_shift_threshold = mean_shift_threshold
+        self.min_drifted = min_drifted
+        self.patience = patience
+        self.sketches = {name: StreamingHistogram(ref['edges'])
+                         for name, ref in self.reference.items()}
+        self.rows_seen = 0
+        self._in_window = 0
+        self._streak = 0
+
+    def update(self, X, confidence=None):
+        """
+        Feed a batch of rows (DataFrame with the feature columns). Batches
+        are split at window boundaries so every window holds exactly
+        `window` rows. Returns the reports of all windows closed, in order.
+        """
+        if confidence is not None:
+            X = X.assign(**{CONFIDENCE: np.asarray(confidence, dtype=float)})
+        reports = []
+        start = 0
+        while start < len(X):
+            take = min(self.window - self._in_window, len(X) - start)
+            chunk = X.iloc[start:start + take]
+            for name, sketch in self.sketches.items():
+                if name in chunk:
+                    sketch.update(chunk[name].to_numpy())
+            self._in_window += take
+            self.rows_seen += take
+            start += take
+            if self._in_window >= self.window:
+                reports.append(self._close_window())
+        return reports
+
+    def _close_window(self):
+        drifted = {}
+        scores = {}
+        for name, sketch in self.sketches.items():
+            if sketch.n == 0:
+                continue
+            ref = self.reference[name]
+            score = psi(ref['proportions'], sketch.proportions())
+            shift = abs(sketch.stats.mean - ref['mean']) / (ref['std'] or _EPS)
+            scores[name] = {'psi': score, 'mean_shift': shift,
+                            'median': sketch.quantile(0.5)}
+            if score > self.psi_threshold or shift > self.mean_shift_threshold:
+                drifted[name] = scores[name]
+            sketch.reset()
+        self._in_window = 0
+
+        self._streak = self._streak + 1 if len(drifted) >= self.min_drifted else 0
+        return {
+            'rows_seen': self.rows_seen,
+            'drifted': drifted,
+            'scores': scores,
+            'retrain': self._streak >= self.patience,
+        }
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def _confidence(model, X):
+    if model is None or not hasattr(model, 'predict_proba'):
+        return None
+    return model.predict_proba(X[FEATURES]).max(axis=1)
+
+
+def _load_model(path):
+    if path is None:
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def cmd_profile(args):
+    df = pd.read_csv(args.data)
+    model = _load_model(args.model)
+    # confidence on the model's own training rows is inflated; use held-out rows
+    holdout = pd.read_csv(args.holdout) if args.holdout else df
+    profile = build_reference_profile(df, _confidence(model, holdout), n_bins=args.bins)
+    save_reference_profile(profile, args.out)
+    print(f"Saved reference profile for {len(profile['columns'])} columns to '{args.out}'")
+
+
+def cmd_replay(args):
+    df = pd.read_csv(args.data)
+    if args.shuffle:
+        # collection order is not stationary; shuffle to get a clean baseline
+        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+    for spec in args.shift:
+        col, factor = spec.split('=')
+        df.loc[df.index >= args.shift_from, col] = df.loc[df.index >= args.shift_from, col] * float(factor)
+
+    monitor = DriftMonitor(load_reference_profile(args.profile), window=args.window,
+                           psi_threshold=args.psi_threshold, patience=args.patience)
+    model = _load_model(args.model)
+
+    first_signal = None
+    start = time.perf_counter()
+    for lo in range(0, len(df), args.batch):
+        batch = df.iloc[lo:lo + args.batch]
+        reports = monitor.update(batch[[c for c in FEATURES if c in batch]],
+                                 _confidence(model, batch))
+        for report in reports:
+            if report['drifted']:
+                print(f"rows={report['rows_seen']:>7}  drifted: "
+                      + ', '.join(f"{n} (psi={s['psi']:.2f}, shift={s['mean_shift']:.2f})"
+                                  for n, s in report['drifted'].items()))
+            if (report['retrain'] and first_signal is None
+                    and report['rows_seen'] > (args.shift_from if args.shift else 0)):
+                first_signal = report['rows_seen']
+    elapsed = time.perf_counter() - start
+
+    print(f"\nReplayed {len(df)} rows in {elapsed:.3f} s ({len(df) / elapsed:,.0f} rows/s)")
+    if first_signal is None:
+        print("No retrain signal raised.")
+    else:
+        lag = f" ({first_signal - args.shift_from} rows after injected shift)" if args.shift else ""
+        print(f"First retrain signal at row {first_signal}{lag}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Streaming drift detection on NISMon metrics.")
+    sub = p.add_subparsers(dest='cmd', required=True)
+
+    pp = sub.add_parser('profile', help="build a reference profile from training data")
+    pp.add_argument('--data', type=Path, required=True)
+    pp.add_argument('--model', type=Path, help="pickled classifier, for the confidence sketch")
+    pp.add_argument('--holdout', type=Path,
+                    help="rows the model was not trained on, for the confidence sketch "
+                         "(default: --data, which must then be held-out)")
+    pp.add_argument('--out', type=Path, required=True)
+    pp.add_argument('--bins', type=int, default=10)
+    pp.set_defaults(func=cmd_profile)
+
+    rp = sub.add_parser('replay', help="replay a CSV through the monitor")
+    rp.add_argument('--data', type=Path, required=True)
+    rp.add_argument('--profile', type=Path, required=True)
+    rp.add_argument('--model', type=Path, help="pickled classifier, for the confidence sketch")
+    rp.add_argument('--window', type=int, default=500)
+    rp.add_argument('--batch', type=int, default=50, help="rows per update() call")
+    rp.add_argument('--psi-threshold', type=float, default=PSI_THRESHOLD)
+    rp.add_argument('--patience', type=int, default=1)
+    rp.add_argument('--shift', action='append', default=[], metavar='COL=FACTOR',
+                    help="multiply COL by FACTOR from --shift-from onwards (repeatable)")
+    rp.add_argument('--shift-from', type=int, default=0)
+    rp.add_argument('--shuffle', action='store_true',
+                    help="shuffle rows before injecting the shift")
+    rp.set_defaults(func=cmd_replay)
+
+    args = p.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
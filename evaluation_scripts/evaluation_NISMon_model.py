@@ -1,170 +1,241 @@
 #!/usr/bin/env python3
-import pandas as pd
-import numpy as np
+"""
+Evaluate a trained NISMon classifier on a labelled test CSV.
+
+Importable as a library (load_test_data / load_model / run_inference /
+compute_metrics / save_results / render_figures) or run as a CLI.  Heavy
+dependencies (sklearn.metrics, psutil, matplotlib) are imported only by the
+functions that need them, so a metrics-only run (`--no-plots`) never pays for
+matplotlib, and figures can optionally be rendered in worker processes.
+"""
+import argparse
+import os
 import pickle
+import threading
 import time
-import psutil, os, threading
-from sklearn.metrics import (
-    accuracy_score,
-    precision_score, recall_score, f1_score,
-    roc_auc_score, average_precision_score,
-    confusion_matrix, roc_curve, precision_recall_curve
-)
-from sklearn.preprocessing import LabelBinarizer
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
 from pathlib import Path
 
-# ─── 1) Paths & Parameters ───────────────────────────────────────────────────
-TEST_CSV    = 'dataset_testing.csv'       # your CSV with string `label` column
-PARENT      = Path.cwd().parent
-MODEL_FILE  = PARENT / 'random_forest_model.pkl'
-OUT_DIR     = Path('evaluation_results_RF')
-OUT_DIR.mkdir(exist_ok=True)
-
-# ─── 2) Load Data & Model ─────────────────────────────────────────────────────
-df = pd.read_csv(TEST_CSV)
-X_test = df.drop(columns=['label'])
-y_true = df['label'].astype(str)
-
-with open(MODEL_FILE, 'rb') as f:
-    model = pickle.load(f)
-
-# ─── 3) Measure Inference Latency ─────────────────────────────────────────────
-_ = model.predict(X_test.iloc[:10])  # warm-up
-start = time.perf_counter()
-y_pred = model.predict(X_test)
-latency_s = time.perf_counter() - start
-n_samples = len(X_test)
-ms_per_sample = latency_s / n_samples * 1e3
-
-# ─── 4) Profile CPU & Memory During Inference ────────────────────────────────
-proc = psutil.Process(os.getpid())
-mem_before = proc.memory_info().rss / (1024**2)  # MiB
-
-cpu_samples = []
-stop_flag = False
-def sample_cpu(interval=0.01):
-    cpu_samples.append(proc.cpu_percent(interval=interval))
-
-def cpu_sampler():
-    while not stop_flag:
-        sample_cpu()
-
-t = threading.Thread(target=cpu_sampler)
-t.start()
-_ = model.predict(X_test)  # profile run
-stop_flag = True
-t.join()
-mem_after = proc.memory_info().rss / (1024**2)
-
-# ─── 5) Compute Classification Metrics ────────────────────────────────────────
-labels = sorted(y_true.unique())  # e.g. ['cpu_interference','incast','memory_contention','normal']
-metrics = {
-    'accuracy': accuracy_score(y_true, y_pred),
-    'precision_macro': precision_score(y_true, y_pred, average='macro', zero_division=0),
-    'recall_macro':    recall_score(y_true, y_pred, average='macro', zero_division=0),
-    'f1_macro':        f1_score(y_true, y_pred, average='macro', zero_division=0)
+import pandas as pd
+
+from instrumentation import stage, count
+
+# ─── 1) Defaults ─────────────────────────────────────────────────────────────
+DEFAULT_TEST_CSV   = Path('dataset_testing.csv')      # CSV with string `label` column
+DEFAULT_MODEL_FILE = Path.cwd().parent / 'random_forest_model.pkl'
+DEFAULT_OUT_DIR    = Path('evaluation_results_RF')
+
+# One-letter ticks for the confusion-matrix plot, keyed by full label name
+SHORT_LABELS = {
+    'cpu_interference': 'C',
+    'incast': 'I',
+    'memory_contention': 'M',
+    'normal': 'N',
 }
 
-# ROC/PR AUC per class if proba available
-if hasattr(model, 'predict_proba'):
-    y_proba = model.predict_proba(X_test)
-    lb = LabelBinarizer().fit(y_true)
-    y_onehot = lb.transform(y_true)
-    for i, cls in enumerate(lb.classes_):
-        metrics[f'roc_auc_{cls}'] = roc_auc_score(y_onehot[:, i], y_proba[:, i])
-        metrics[f'ap_{cls}']      = average_precision_score(y_onehot[:, i], y_proba[:, i])
-
-# ─── 6) Save Confusion Matrix & Metrics ─────────────────────────────────────
-cm = confusion_matrix(y_true, y_pred, labels=labels)
-cm_df = pd.DataFrame(cm, index=[f'true_{l}' for l in labels],
-                     columns=[f'pred_{l}' for l in labels])
-cm_df.to_csv(OUT_DIR / 'confusion_matrix.csv')
-pd.Series(metrics).to_csv(OUT_DIR / 'metrics_summary.csv', header=['value'])
-
-# ─── 7) Save Latency & Resource Usage ────────────────────────────────────────
-with open(OUT_DIR / 'latency_resources.txt', 'w') as f:
-    f.write(f"Total inference time: {latency_s:.4f} s for {n_samples} samples\n")
-    f.write(f"Avg latency/sample:   {ms_per_sample:.3f} ms\n")
-    f.write(f"Memory before:        {mem_before:.1f} MiB\n")
-    f.write(f"Memory after:         {mem_after:.1f} MiB\n")
-    f.write(f"Peak mem overhead:    {mem_after - mem_before:.1f} MiB\n")
-    f.write("CPU% during inference (min/avg/max): "
-            f"{min(cpu_samples):.1f}/{sum(cpu_samples)/len(cpu_samples):.1f}/{max(cpu_samples):.1f}\n")
-
-# ─── 8) Plot & Save Figures ─────────────────────────────────────────────────
-# 8a) Improved Confusion Matrix Plot with legend at top center
-short_labels = ['C', 'I', 'M', 'N']  # Corresponds to ['cpu_interference','incast','memory_contention','normal']
-
-plt.figure(figsize=(12, 10))
-plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-cbar = plt.colorbar()
-cbar.ax.tick_params(labelsize=20, width=0)   # tick label size=20
-for t in cbar.ax.get_yticklabels():
-    t.set_fontweight('bold')
-
-# Set the one‐letter ticks with bold, larger font
-plt.xticks(
-    range(len(labels)),
-    short_labels,
-    fontsize=28,
-    fontweight='bold'
-)
-plt.yticks(
-    range(len(labels)),
-    short_labels,
-    fontsize=28,
-    fontweight='bold'
-)
-
-# Annotate counts inside each cell
-for i in range(len(labels)):
-    for j in range(len(labels)):
-        plt.text(
-            j,
-            i,
-            cm[i, j],
-            ha='center',
-            va='center',
-            color='white' if cm[i, j] > cm.max() / 2 else 'black',
-            fontsize=28,
-            fontweight='bold'
-        )
-
-# Build legend handles showing full names for each short label
-handles = []
-full_names = labels  # ['cpu_interference','incast','memory_contention','normal']
-for short, full in zip(short_labels, full_names):
-    handles.append(
-        Line2D([], [], linestyle='', marker='', label=f"{short}: {full}")
+# ─── 2) Load Data & Model ────────────────────────────────────────────────────
+def load_test_data(test_csv):
+    """Return (X_test, y_true) from a CSV with feature columns plus `label`."""
+    df = pd.read_csv(test_csv)
+    X_test = df.drop(columns=['label'])
+    y_true = df['label'].astype(str)
+    return X_test, y_true
+
+
+def load_model(model_file):
+    """Unpickle a trained classifier."""
+    with open(model_file, 'rb') as f:
+        return pickle.load(f)
+
+# ─── 3) Inference Latency & Resource Usage ───────────────────────────────────
+def run_inference(model, X_test, profile=True):
+    """
+    Predict on X_test and measure latency. Returns (y_pred, y_proba, usage),
+    where y_proba is None if the model has no predict_proba and usage is a
+    dict of latency (and, if profile=True, CPU/memory) figures.
+    """
+    _ = model.predict(X_test.iloc[:10])  # warm-up
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    latency_s = time.perf_counter() - start
+    n_samples = len(X_test)
+
+    usage = {
+        'latency_s': latency_s,
+        'n_samples': n_samples,
+        'ms_per_sample': latency_s / n_samples * 1e3,
+    }
+    if profile:
+        usage.update(profile_resources(model, X_test))
+
+    y_proba = model.predict_proba(X_test) if hasattr(model, 'predict_proba') else None
+    return y_pred, y_proba, usage
+
+
+def profile_resources(model, X_test, interval=0.01):
+    """Sample CPU% and RSS while running one extra predict pass."""
+    import psutil
+
+    proc = psutil.Process(os.getpid())
+    mem_before = proc.memory_info().rss / (1024**2)  # MiB
+
+    cpu_samples = []
+    stop = threading.Event()
+
+    def cpu_sampler():
+        while not stop.is_set():
+            cpu_samples.append(proc.cpu_percent(interval=interval))
+
+    t = threading.Thread(target=cpu_sampler)
+    t.start()
+    _ = model.predict(X_test)  # profile run
+    stop.set()
+    t.join()
+    mem_after = proc.memory_info().rss / (1024**2)
+
+    if not cpu_samples:
+        cpu_samples = [0.0]
+    return {
+        'mem_before_MiB': mem_before,
+        'mem_after_MiB': mem_after,
+        'cpu_min_pct': min(cpu_samples),
+        'cpu_avg_pct': sum(cpu_samples) / len(cpu_samples),
+        'cpu_max_pct': max(cpu_samples),
+    }
+
+# ─── 4) Classification Metrics ───────────────────────────────────────────────
+def compute_metrics(y_true, y_pred, y_proba=None, classes=None):
+    """
+    Compute accuracy, macro precision/recall/F1, the confusion matrix and,
+    if y_proba is given, per-class ROC-AUC and average precision.
+
+    `classes` is the column order of y_proba (model.classes_); it defaults to
+    the sorted true labels. Returns (metrics, cm, labels).
+    """
+    from sklearn.metrics import (
+        accuracy_score,
+        precision_score, recall_score, f1_score,
+        roc_auc_score, average_precision_score,
+        confusion_matrix
     )
 
-# Shrink the axes from the top to make room for the legend
-plt.tight_layout()
-plt.subplots_adjust(top=0.80)  # leave 20% of figure height above axes
+    labels = sorted(pd.unique(y_true))
+    metrics = {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision_macro': precision_score(y_true, y_pred, average='macro', zero_division=0),
+        'recall_macro':    recall_score(y_true, y_pred, average='macro', zero_division=0),
+        'f1_macro':        f1_score(y_true, y_pred, average='macro', zero_division=0)
+    }
+
+    if y_proba is not None:
+        y_onehot = one_hot(y_true, classes if classes is not None else labels)
+        for i, cls in enumerate(classes if classes is not None else labels):
+            metrics[f'roc_auc_{cls}'] = roc_auc_score(y_onehot[:, i], y_proba[:, i])
+            metrics[f'ap_{cls}']      = average_precision_score(y_onehot[:, i], y_proba[:, i])
+
+    cm = confusion_matrix(y_true, y_pred, labels=labels)
+    return metrics, cm, labels
+
+
+def one_hot(y_true, classes):
+    """One-hot encode y_true against an explicit class order."""
+    return (pd.Series(y_true).to_numpy()[:, None] == pd.Series(classes).to_numpy()[None, :]).astype(int)
+
+# ─── 5) Save Confusion Matrix, Metrics & Resource Usage ──────────────────────
+def save_results(out_dir, metrics, cm, labels, usage=None):
+    """Write confusion_matrix.csv, metrics_summary.csv and latency_resources.txt."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    cm_df = pd.DataFrame(cm, index=[f'true_{l}' for l in labels],
+                         columns=[f'pred_{l}' for l in labels])
+    cm_df.to_csv(out_dir / 'confusion_matrix.csv')
+    pd.Series(metrics).to_csv(out_dir / 'metrics_summary.csv', header=['value'])
+
+    if usage is None:
+        return
+    with open(out_dir / 'latency_resources.txt', 'w') as f:
+        f.write(f"Total inference time: {usage['latency_s']:.4f} s for {usage['n_samples']} samples\n")
+        f.write(f"Avg latency/sample:   {usage['ms_per_sample']:.3f} ms\n")
+        if 'mem_before_MiB' in usage:
+            f.write(f"Memory before:        {usage['mem_before_MiB']:.1f} MiB\n")
+            f.write(f"Memory after:         {usage['mem_after_MiB']:.1f} MiB\n")
+            f.write(f"Peak mem overhead:    {usage['mem_after_MiB'] - usage['mem_before_MiB']:.1f} MiB\n")
+            f.write("CPU% during inference (min/avg/max): "
+                    f"{usage['cpu_min_pct']:.1f}/{usage['cpu_avg_pct']:.1f}/{usage['cpu_max_pct']:.1f}\n")
+
+# ─── 6) Plot & Save Figures ──────────────────────────────────────────────────
+def _pyplot():
+    """Import pyplot with the non-interactive Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
 
-# Place the legend in the freed‐up space above the heatmap
-plt.legend(
-    handles=handles,
-    loc='upper center',
-    bbox_to_anchor=(0.5, 1.16),
-    ncol=2,
-    borderaxespad=0.0,
-    prop={'size': 24, 'weight': 'bold'}
-)
+def plot_confusion_matrix(cm, labels, out_path):
+    """Confusion-matrix heatmap with one-letter ticks and a legend at top center."""
+    plt = _pyplot()
+    from matplotlib.lines import Line2D
 
-plt.savefig(OUT_DIR / 'confusion_matrix.png', bbox_inches='tight')
-plt.close()
+    short_labels = [SHORT_LABELS.get(l, l) for l in labels]
 
+    plt.figure(figsize=(12, 10))
+    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
+    cbar = plt.colorbar()
+    cbar.ax.tick_params(labelsize=20, width=0)   # tick label size=20
+    for t in cbar.ax.get_yticklabels():
+        t.set_fontweight('bold')
+
+    # Set the one-letter ticks with bold, larger font
+    plt.xticks(range(len(labels)), short_labels, fontsize=28, fontweight='bold')
+    plt.yticks(range(len(labels)), short_labels, fontsize=28, fontweight='bold')
+
+    # Annotate counts inside each cell
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            plt.text(
+                j,
+                i,
+                cm[i, j],
+                ha='center',
+                va='center',
+                color='white' if cm[i, j] > cm.max() / 2 else 'black',
+                fontsize=28,
+                fontweight='bold'
+            )
+
+    # Build legend handles showing full names for each short label
+    handles = [
+        Line2D([], [], linestyle='', marker='', label=f"{short}: {full}")
+        for short, full in zip(short_labels, labels)
+    ]
+
+    # Shrink the axes from the top to make room for the legend
+    plt.tight_layout()
+    plt.subplots_adjust(top=0.80)  # leave 20% of figure height above axes
+
+    # Place the legend in the freed-up space above the heatmap
+    plt.legend(
+        handles=handles,
+        loc='upper center',
+        bbox_to_anchor=(0.5, 1.16),
+        ncol=2,
+        borderaxespad=0.0,
+        prop={'size': 24, 'weight': 'bold'}
+    )
+
+    plt.savefig(out_path, bbox_inches='tight')
+    plt.close()
+
+
+def plot_roc(y_onehot, y_proba, classes, out_path):
+    """Combined ROC curves for all classes."""
+    plt = _pyplot()
+    from sklearn.metrics import roc_curve
 
-# 8b) Combined ROC & PR curves for all classes
-if hasattr(model, 'predict_proba'):
-    # Combined ROC‐curve figure
     plt.figure(figsize=(8, 6))
-    for i, cls in enumerate(lb.classes_):
+    for i, cls in enumerate(classes):
         fpr, tpr, _ = roc_curve(y_onehot[:, i], y_proba[:, i])
-        auc_score = metrics[f'roc_auc_{cls}']
         plt.plot(fpr, tpr, lw=2, label=f"{cls}")
 
     plt.plot([0, 1], [0, 1], linestyle='--', color='gray', lw=1)
@@ -174,14 +245,18 @@ if hasattr(model, 'predict_proba'):
     plt.yticks(fontsize=20, fontweight='bold')
     plt.legend(loc='lower right', prop={'size': 16, 'weight': 'bold'})
     plt.tight_layout()
-    plt.savefig(OUT_DIR / 'roc_all_classes.png')
+    plt.savefig(out_path)
     plt.close()
 
-    # Combined Precision‐Recall figure
+
+def plot_pr(y_onehot, y_proba, classes, out_path):
+    """Combined Precision-Recall curves for all classes."""
+    plt = _pyplot()
+    from sklearn.metrics import precision_recall_curve
+
     plt.figure(figsize=(8, 6))
-    for i, cls in enumerate(lb.classes_):
+    for i, cls in enumerate(classes):
         prec, rec, _ = precision_recall_curve(y_onehot[:, i], y_proba[:, i])
-        ap_score = metrics[f'ap_{cls}']
         plt.step(rec, prec, where='post', lw=2, label=f"{cls}")
 
     plt.xlabel("Recall", fontsize=22, fontweight='bold')
@@ -190,7 +265,99 @@ if hasattr(model, 'predict_proba'):
     plt.yticks(fontsize=20, fontweight='bold')
     plt.legend(loc='center right', prop={'size': 14, 'weight': 'bold'})
     plt.tight_layout()
-    plt.savefig(OUT_DIR / 'pr_all_classes.png')
+    plt.savefig(out_path)
     plt.close()
 
-print(f"✅ All evaluation outputs written to {OUT_DIR}/")
+
+def render_figures(out_dir, cm, labels, y_true=None, y_proba=None, classes=None, workers=1):
+    """
+    Render confusion_matrix.png and, if y_proba is given, roc_all_classes.png
+    and pr_all_classes.png. With workers <= 1 (the default) they are drawn in
+    this process; with workers > 1 each figure is drawn in its own process,
+    which only pays off when each worker has a spare core, since every
+    worker re-imports matplotlib and sklearn.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = [(plot_confusion_matrix, (cm, labels, out_dir / 'confusion_matrix.png'))]
+    if y_proba is not None:
+        classes = list(classes if classes is not None else labels)
+        y_onehot = one_hot(y_true, classes)
+        jobs.append((plot_roc, (y_onehot, y_proba, classes, out_dir / 'roc_all_classes.png')))
+        jobs.append((plot_pr, (y_onehot, y_proba, classes, out_dir / 'pr_all_classes.png')))
+
+    if workers <= 1:
+        for fn, args in jobs:
+            fn(*args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for fut in [pool.submit(fn, *args) for fn, args in jobs]:
+            fut.result()
+
+# ─── 7) End-to-end Evaluation ────────────────────────────────────────────────
+def evaluate(model_file, test_csv, out_dir, plots=True, plot_workers=1, profile=True,
+             cold_start=False):
+    """
+    Load, predict, score and save; optionally render figures. Returns metrics.
+
+    With cold_start=True (CLI runs), the time from process start to the
+    metrics being written is appended to latency_resources.txt.
+    """
+    with stage('evaluate.load_data', path=str(test_csv)):
+        X_test, y_true = load_test_data(test_csv)
+        count('rows', len(X_test))
+    with stage('evaluate.load_model', path=str(model_file)):
+        model = load_model(model_file)
+
+    with stage('evaluate.inference', rows=len(X_test), profile=profile):
+        y_pred, y_proba, usage = run_inference(model, X_test, profile=profile)
+    classes = getattr(model, 'classes_', None)
+    with stage('evaluate.metrics'):
+        metrics, cm, labels = compute_metrics(y_true, y_pred, y_proba, classes)
+
+    with stage('evaluate.save_results'):
+        save_results(out_dir, metrics, cm, labels, usage)
+
+    if cold_start:
+        import psutil
+        usage['cold_start_s'] = time.time() - psutil.Process(os.getpid()).create_time()
+        with open(Path(out_dir) / 'latency_resources.txt', 'a') as f:
+            f.write(f"Cold start to metrics: {usage['cold_start_s']:.3f} s "
+                    "(process start → metrics written)\n")
+
+    if plots:
+        with stage('evaluate.render_figures', workers=plot_workers):
+            render_figures(out_dir, cm, labels, y_true, y_proba, classes, workers=plot_workers)
+    return metrics
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Evaluate a trained NISMon classifier.")
+    p.add_argument('--model-path', type=Path, default=DEFAULT_MODEL_FILE,
+                   help="pickled classifier (default: %(default)s)")
+    p.add_argument('--test-data', type=Path, default=DEFAULT_TEST_CSV,
+                   help="test CSV with a `label` column (default: %(default)s)")
+    p.add_argument('--results-dir', type=Path, default=DEFAULT_OUT_DIR,
+                   help="output directory (default: %(default)s)")
+    p.add_argument('--no-plots', action='store_true',
+                   help="write metrics only; skip matplotlib entirely")
+    p.add_argument('--plot-workers', type=int, default=1,
+                   help="processes used to render figures; 1 renders in-process (default: %(default)s)")
+    p.add_argument('--no-profile', action='store_true',
+                   help="skip the extra CPU/memory profiling predict pass")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    evaluate(args.model_path, args.test_data, args.results_dir,
+             plots=not args.no_plots, plot_workers=args.plot_workers,
+             profile=not args.no_profile, cold_start=True)
+    print(f"✅ All evaluation outputs written to {args.results_dir}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Fault event logs and a sorted interval index for labelling samples.
+
+The collectors (metrics_collection_with_*.sh) write, next to each
+`<run>.csv`, a `<run>_events.csv` with one row per injected fault:
+
+    fault,start,end
+    1,2025-06-01 10:00:05.123456789,2025-06-01 10:00:10.204518330
+
+FaultIntervalIndex sorts the events by start time once and then resolves
+the fault code of any number of samples with a single vectorised
+np.searchsorted, i.e. O(log n) per sample in the number of events.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+EVENTS_SUFFIX = '_events.csv'
+
+
+def events_path_for(csv_path):
+    """`<run>.csv` → `<run>_events.csv`."""
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + EVENTS_SUFFIX)
+
+
+def is_events_file(path):
+    return Path(path).name.endswith(EVENTS_SUFFIX)
+
+
+def _to_ns(values):
+    """Timestamps (strings or datetimes) → int64 nanoseconds."""
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+class FaultIntervalIndex:
+    """
+    Sorted index over [start, end) fault intervals.
+
+    Intervals may overlap (random-fault runs can inject a new fault before
+    the previous one ends). For each prefix of the start-sorted events we
+    keep the largest end seen so far and which event it belongs to; a query
+    then only needs the last event that starts before it. Where faults
+    overlap, the one that stays active longest wins.
+    """
+
+    def __init__(self, starts, ends, codes):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        codes = np.asarray(codes, dtype=np.int64)
+
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.codes = codes[order]
+
+        # running max of `end` and the position of the event that holds it
+        self._max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        pos = np.arange(len(self.ends))
+        self._max_pos = np.maximum.accumulate(np.where(self.ends == self._max_end, pos, 0))
+
+    @classmethod
+    def from_csv(cls, path):
+        events = pd.read_csv(path)
+        return cls(_to_ns(events['start']), _to_ns(events['end']),
+                   pd.to_numeric(events['fault'], errors='coerce').fillna(0).astype(int))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def resolve(self, t_start, t_end=None):
+        """
+        Fault code active for each sample, 0 where none.
+
+        With only t_start, a sample is a point and matches an event with
+        start <= t < end. With t_end, the sample is the window
+        [t_start, t_end) and matches any event that overlaps it.
+        """
+        t_start = np.asarray(t_start, dtype=np.int64)
+        out = np.zeros(len(t_start), dtype=np.int64)
+        if len(self) == 0:
+            return out
+
+        if t_end is None:
+            j = np.searchsorted(self.starts, t_start, side='right') - 1
+        else:
+            j = np.searchsorted(self.starts, np.asarray(t_end, dtype=np.int64), side='left') - 1
+        valid = j >= 0
+        jv = j[valid]
+        hit = self._max_end[jv] > t_start[valid]
+        out[np.flatnonzero(valid)[hit]] = self.codes[self._max_pos[jv[hit]]]
+        return out
+
+    def label_samples(self, timestamps):
+        """
+        Resolve codes for collector rows. Row i measures the interval up to
+        row i+1's timestamp; the last row gets the median sample period.
+        """
+        t = _to_ns(timestamps)
+        if len(t) == 0:
+            return np.zeros(0, dtype=np.int64)
+        step = np.diff(t)
+        period = int(np.median(step)) if len(step) else 1_000_000_000
+        t_end = np.append(t[1:], t[-1] + period)
+        return self.resolve(t, t_end)
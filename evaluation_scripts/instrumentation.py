@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Stage-level instrumentation shared by the NISMon merge, training and
+evaluation scripts.
+
+    from instrumentation import stage, timed, count
+
+    with stage('load_csv', path=str(p)):
+        df = pd.read_csv(p)
+        count('rows', len(df))
+
+    @timed('train')
+    def train(...): ...
+
+Every stage records wall time, CPU time of this process (`cpu_s`), RSS
+before/after and the process-lifetime peak RSS (`process_peak_rss_mib`,
+ru_maxrss -- not a per-stage figure), plus any counters bumped inside it.
+With psutil installed, `children_cpu_s` adds the CPU time of child
+processes over the stage (e.g. GridSearchCV's n_jobs workers). It is
+process-wide, so stages overlapping on other threads share it. The only
+per-stage memory peak is `heap_peak_mib`, recorded with
+NISMON_TRACE_MEMORY=1. tracemalloc has a single process-wide peak, so a
+stage that overlaps a heap-tracked stage on another thread records no
+`heap_peak_mib` rather than a wrong one.
+Behaviour is controlled by environment variables, so the scripts themselves
+need no flags:
+
+  NISMON_TRACE=trace.jsonl   append one JSON line per stage (Chrome trace
+                             "complete" events; see `chrome` below)
+  NISMON_TRACE_MEMORY=1      also track the Python-heap peak per stage
+                             (tracemalloc; slows allocation-heavy code)
+  NISMON_PROFILE=cprofile    dump a cProfile .prof per top-level stage; only
+                             one stage is profiled at a time, concurrent
+                             top-level stages on other threads are skipped
+  NISMON_PROFILE=sample      dump sampled collapsed stacks per top-level
+                             stage (flamegraph.pl / speedscope format)
+
+Without NISMON_TRACE nothing is written and the overhead is a few
+perf_counter calls per stage.
+
+CLI:
+  python instrumentation.py summary trace.jsonl
+  python instrumentation.py diff before.jsonl after.jsonl
+  python instrumentation.py chrome trace.jsonl trace.json   # chrome://tracing
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_ENV   = 'NISMON_TRACE'
+MEMORY_ENV  = 'NISMON_TRACE_MEMORY'
+PROFILE_ENV = 'NISMON_PROFILE'
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_counters = Counter()   # process-wide totals, see counters()
+_cprofile_lock = threading.Lock()   # held while a cProfile is active
+
+# tracemalloc is process-wide; stages on all threads share it through these
+_heap_lock = threading.Lock()
+_heap_open = Counter()   # thread id → open heap-tracking stages
+_heap_opened = 0         # heap-tracking stages ever opened, all threads
+_heap_started = False    # tracemalloc was started by stage() (not by the caller)
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _rss_mib():
+    """Current resident set size in MiB (0 if it cannot be read)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024**2)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def _peak_rss_mib():
+    """Process-lifetime peak RSS in MiB."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024**2)
+
+
+def _children_cpu_s():
+    """
+    CPU seconds used so far by all descendant processes: reaped children
+    (RUSAGE_CHILDREN) plus live ones such as joblib's worker pool, which
+    needs psutil. None without psutil.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    total = 0.0
+    if resource is not None:
+        ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += ru.ru_utime + ru.ru_stime
+    for child in psutil.Process().children(recursive=True):
+        try:
+            t = child.cpu_times()
+            total += t.user + t.system + t.children_user + t.children_system
+        except psutil.Error:   # exited since children() listed it
+            pass
+    return total
+
+
+def _emit(event):
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return
+    line = json.dumps(event, default=str)
+    with _write_lock, open(path, 'a') as f:
+        f.write(line + '\n')
+
+# ─── Profilers ───────────────────────────────────────────────────────────────
+class _SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, out_path):
+        self._stop.set()
+        self._thread.join()
+        with open(out_path, 'w') as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def _profile_path(name, suffix):
+    base = os.environ.get(TRACE_ENV) or 'nismon_trace'
+    safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+    return f"{base}.{safe}.{os.getpid()}.{suffix}"
+
+
+@contextmanager
+def _maybe_profile(name):
+    mode = os.environ.get(PROFILE_ENV, '').lower()
+    if mode == 'cprofile':
+        # Only one cProfile may be active per process (Python 3.12+ raises
+        # otherwise), so a stage started while another thread is profiling
+        # runs unprofiled.
+        if not _cprofile_lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            import cProfile
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:   # another profiling tool is active
+                prof = None
+            try:
+                yield
+            finally:
+                if prof is not None:
+                    prof.disable()
+                    prof.dump_stats(_profile_path(name, 'prof'))
+        finally:
+            _cprofile_lock.release()
+    elif mode == 'sample':
+        sampler = _SamplingProfiler(threading.get_ident())
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop(_profile_path(name, 'folded'))
+    else:
+        yield
+
+# ─── Heap tracking ───────────────────────────────────────────────────────────
+def _heap_enter(parent_frame):
+    """
+    Register a heap-tracking stage and reset the tracemalloc peak for it.
+    tracemalloc is started by the first open stage and stopped by the last.
+    Returns a marker for _heap_exit, or None if a stage on another thread is
+    open: resetting the shared peak would corrupt that stage's figure.
+    """
+    global _heap_opened, _heap_started
+    import tracemalloc
+    tid = threading.get_ident()
+    with _heap_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _heap_started = True
+        others_open = sum(_heap_open.values()) - _heap_open[tid]
+        _heap_open[tid] += 1
+        _heap_opened += 1
+        _local.heap_opened = getattr(_local, 'heap_opened', 0) + 1
+        if others_open or not hasattr(tracemalloc, 'reset_peak'):
+            return None
+        # One global peak: before a nested stage resets it, bank the
+        # parent's peak so far; on exit each stage takes the max of the live
+        # peak, its banked peak and its children's peaks.
+        if parent_frame is not None:
+            parent_frame['heap_peak'] = max(parent_frame['heap_peak'],
+                                            tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        return _heap_opened - _local.heap_opened   # stages opened by other threads
+
+
+def _heap_exit(frame, marker):
+    """
+    Unregister a heap-tracking stage; return its peak in bytes, or None if a
+    stage on another thread was open at any point during it.
+    """
+    global _heap_started
+    import tracemalloc
+    tid = threading.get_ident()
+    with _heap_lock:
+        peak = None
+        others_open = sum(_heap_open.values()) - _heap_open[tid]
+        if (marker is not None and not others_open
+                and _heap_opened - _local.heap_opened == marker):
+            peak = max(tracemalloc.get_traced_memory()[1], frame['heap_peak'])
+        _heap_open[tid] -= 1
+        if not _heap_open[tid]:
+            del _heap_open[tid]
+        if not _heap_open and _heap_started:
+            tracemalloc.stop()
+            _heap_started = False
+    return peak
+
+# ─── Public API ──────────────────────────────────────────────────────────────
+@contextmanager
+def stage(name, **attrs):
+    """
+    Time a block of work as a named stage. Keyword arguments are recorded
+    with the event. Stages nest; profiling (NISMON_PROFILE) is applied only
+    to outermost stages so profiles do not overlap.
+    """
+    stack = _stack()
+    parent_frame = stack[-1] if stack else None
+    parent = parent_frame['name'] if parent_frame else None
+    frame = {'name': name, 'counters': Counter(), 'heap_peak': 0}
+    stack.append(frame)
+
+    # before heap tracking starts, so psutil's allocations are not counted
+    tracing = bool(os.environ.get(TRACE_ENV))
+    children_cpu0 = _children_cpu_s() if tracing else None
+
+    track_heap = os.environ.get(MEMORY_ENV) == '1'
+    if track_heap:
+        heap_marker = _heap_enter(parent_frame)
+
+    rss_before = _rss_mib()
+    ts = time.time()
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    try:
+        if parent is None:
+            with _maybe_profile(name):
+                yield frame['counters']
+        else:
+            yield frame['counters']
+    finally:
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        stack.pop()
+        heap_peak = _heap_exit(frame, heap_marker) if track_heap else None
+        if stack:
+            stack[-1]['counters'].update(frame['counters'])
+            if heap_peak is not None:
+                stack[-1]['heap_peak'] = max(stack[-1]['heap_peak'], heap_peak)
+
+        args = dict(attrs)
+        args.update({
+            'parent': parent,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rss_before_mib': rss_before,
+            'rss_after_mib': _rss_mib(),
+            'process_peak_rss_mib': _peak_rss_mib(),
+        })
+        if children_cpu0 is not None:
+            args['children_cpu_s'] = _children_cpu_s() - children_cpu0
+        if heap_peak is not None:
+            args['heap_peak_mib'] = heap_peak / (1024**2)
+        if frame['counters']:
+            args['counters'] = dict(frame['counters'])
+
+        _emit({
+            'name': name,
+            'ph': 'X',
+            'ts': int(ts * 1e6),
+            'dur': int(wall * 1e6),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': args,
+        })
+
+
+def timed(name=None, **attrs):
+    """Decorator form of stage(); defaults to the function's qualified name."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(label, **attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Add n to a counter on the innermost active stage (and the process total)."""
+    _counters[name] += n
+    stack = _stack()
+    if stack:
+        stack[-1]['counters'][name] += n
+
+
+def counters():
+    """Process-wide counter totals."""
+    return dict(_counters)
+
+# ─── Trace tools ─────────────────────────────────────────────────────────────
+def read_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(events):
+    """
+    Aggregate events by stage name: calls, total wall/CPU s (own process and
+    children), the largest per-stage heap peak (if traced with
+    NISMON_TRACE_MEMORY=1) and the process peak RSS reached by the end of
+    the stage.
+    """
+    agg = defaultdict(lambda: {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'children_cpu_s': None,
+                               'heap_peak_mib': None, 'process_peak_rss_mib': 0.0})
+    for ev in events:
+        a = agg[ev['name']]
+        args = ev['args']
+        a['calls'] += 1
+        a['wall_s'] += args['wall_s']
+        a['cpu_s'] += args['cpu_s']
+        if 'children_cpu_s' in args:
+            a['children_cpu_s'] = (a['children_cpu_s'] or 0.0) + args['children_cpu_s']
+        if 'heap_peak_mib' in args:
+            a['heap_peak_mib'] = max(a['heap_peak_mib'] or 0.0, args['heap_peak_mib'])
+        a['process_peak_rss_mib'] = max(a['process_peak_rss_mib'],
+                                        args.get('process_peak_rss_mib', 0.0))
+    return dict(agg)
+
+
+def _cmd_summary(args):
+    summary = summarize(read_trace(args.trace))
+    print(f"{'stage':<32}{'calls':>7}{'wall_s':>11}{'cpu_s':>11}{'child_cpu_s':>13}"
+          f"{'heap_peak_MiB':>15}{'proc_peak_MiB':>15}")
+    for name, a in sorted(summary.items(), key=lambda kv: -kv[1]['wall_s']):
+        child = f"{a['children_cpu_s']:.3f}" if a['children_cpu_s'] is not None else '-'
+        heap = f"{a['heap_peak_mib']:.1f}" if a['heap_peak_mib'] is not None else '-'
+        print(f"{name:<32}{a['calls']:>7}{a['wall_s']:>11.3f}{a['cpu_s']:>11.3f}{child:>13}"
+              f"{heap:>15}{a['process_peak_rss_mib']:>15.1f}")
+
+
+def _cmd_diff(args):
+    before = summarize(read_trace(args.before))
+    after = summarize(read_trace(args.after))
+    print(f"{'stage':<32}{'before_s':>11}{'after_s':>11}{'delta':>10}")
+    for name in sorted(set(before) | set(after),
+                       key=lambda n: -max(before.get(n, {}).get('wall_s', 0),
+                                          after.get(n, {}).get('wall_s', 0))):
+        b = before.get(name, {}).get('wall_s')
+        a = after.get(name, {}).get('wall_s')
+        if b and a:
+            delta = f"{(a - b) / b * 100:+.1f}%"
+        else:
+            delta = 'new' if a is not None else 'gone'
+        fmt = lambda v: f"{v:.3f}" if v is not None else '-'
+        print(f"{name:<32}{fmt(b):>11}{fmt(a):>11}{delta:>10}")
+
+
+def _cmd_chrome(args):
+    with open(args.out, 'w') as f:
+        json.dump({'traceEvents': read_trace(args.trace)}, f)
+    print(f"Wrote Chrome trace to '{args.out}'")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Inspect NISMon stage traces.")
+    sub = p.add_subparsers(dest='cmd', required=True)
+
+    sp = sub.add_parser('summary', help="per-stage totals for one trace")
+    sp.add_argument('trace', type=Path)
+    sp.set_defaults(func=_cmd_summary)
+
+    dp = sub.add_parser('diff', help="compare per-stage wall time between two traces")
+    dp.add_argument('before', type=Path)
+    dp.add_argument('after', type=Path)
+    dp.set_defaults(func=_cmd_diff)
+
+    cp = sub.add_parser('chrome', help="convert JSON lines to a chrome://tracing file")
+    cp.add_argument('trace', type=Path)
+    cp.add_argument('out', type=Path)
+    cp.set_defaults(func=_cmd_chrome)
+
+    args = p.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 import re
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from fault_events import FaultIntervalIndex, events_path_for, is_events_file
+from instrumentation import stage, timed, count
+
 def parse_size(value):
     """
     Convert strings like '32K', '33M', '1T' to integer values:
@@ -30,6 +34,7 @@ def parse_size(value):
         num *= 1_000_000_000_000
     return int(num)
 
+@timed('merge.concat_and_label')
 def concat_and_label(base_folder):
     """
     Read all CSVs directly under base_folder, convert K/M/T suffix values,
@@ -39,9 +44,12 @@ def concat_and_label(base_folder):
       2 = 'memory_contention'
       3 = 'cpu_interference'
 
-    If drop_pct(%) != 0 but fault == 0, assign the label from the nearest non-zero
-    fault code in the same CSV (previous or next row). Finally, concatenate
-    all files into one cleaned DataFrame.
+    If the collector wrote a `<name>_events.csv` fault log next to the CSV,
+    each row is labelled from the fault interval overlapping its sample window
+    (see fault_events.FaultIntervalIndex). Otherwise, for older runs without a
+    log: if drop_pct(%) != 0 but fault == 0, assign the label from the nearest
+    non-zero fault code in the same CSV (previous or next row). Finally,
+    concatenate all files into one cleaned DataFrame.
     """
     all_dfs = []
     fault_col = 'fault'
@@ -56,7 +64,12 @@ def concat_and_label(base_folder):
     }
 
     for csv_path in sorted(Path(base_folder).glob('*.csv')):
-        df = pd.read_csv(csv_path)
+        if is_events_file(csv_path):
+            continue
+        with stage('merge.read_csv', file=csv_path.name):
+            df = pd.read_csv(csv_path)
+        count('files')
+        count('rows_in', len(df))
 
         # 1) Parse K/M/T suffixes in object columns
         for col in df.select_dtypes(include='object').columns:
@@ -75,24 +88,23 @@ def concat_and_label(base_folder):
         else:
             df[drop_col] = pd.Series(0.0, index=df.index)
 
-        # 3) For rows where fault == 0 and drop_pct != 0,
-        #    assign from nearest non-zero fault in that CSV.
-        fault_nonzero = df[fault_col].replace(0, pd.NA)
-        fwd = fault_nonzero.ffill()
-        bwd = fault_nonzero.bfill()
-        nearest = fwd.where(fwd.notna(), bwd)
-
-        def resolve_label_code(idx, row):
-            orig = row[fault_col]
-            if orig != 0:
-                return orig
-            if row[drop_col] != 0 and pd.notna(nearest.iloc[idx]):
-                return int(nearest.iloc[idx])
-            return 0
-
-        df['resolved_code'] = [
-            resolve_label_code(i, r) for i, r in df.iterrows()
-        ]
+        # 3) Resolve each row's fault code: from the event log when present,
+        #    else for rows where fault == 0 and drop_pct != 0, from the
+        #    nearest non-zero fault in that CSV.
+        events_path = events_path_for(csv_path)
+        with stage('merge.label', file=csv_path.name, rows=len(df)):
+            if events_path.exists() and 'Timestamp' in df.columns:
+                index = FaultIntervalIndex.from_csv(events_path)
+                count('fault_events', len(index))
+                df['resolved_code'] = index.label_samples(df['Timestamp'])
+            else:
+                fault_nonzero = df[fault_col].replace(0, np.nan)
+                nearest = fault_nonzero.ffill().fillna(fault_nonzero.bfill())
+                inherit = (df[drop_col] != 0) & nearest.notna()
+                df['resolved_code'] = np.where(
+                    df[fault_col] != 0, df[fault_col],
+                    np.where(inherit, nearest.fillna(0), 0)
+                ).astype(int)
 
         # 4) Map resolved codes to label strings
         df['label'] = df['resolved_code'].map(code_to_label).fillna('normal')
@@ -102,7 +114,8 @@ def concat_and_label(base_folder):
     # Concatenate all DataFrames
     if not all_dfs:
         return pd.DataFrame()
-    df_all = pd.concat(all_dfs, ignore_index=True)
+    with stage('merge.concat', files=len(all_dfs)):
+        df_all = pd.concat(all_dfs, ignore_index=True)
 
     # 5) Drop 'Timestamp', original 'fault', and 'resolved_code' columns
     df_all = df_all.drop(columns=['Timestamp'], errors='ignore')
@@ -115,6 +128,7 @@ def concat_and_label(base_folder):
     df_all = df_all.dropna(subset=obj_cols)
     for col in obj_cols:
         df_all[col] = df_all[col].astype(int)
+    count('rows_out', len(df_all))
 
     return df_all
 
@@ -122,5 +136,6 @@ if __name__ == '__main__':
     BASE_FOLDER = Path.cwd()
     merged_df = concat_and_label(BASE_FOLDER)
     out_file = BASE_FOLDER / 'dataset_testing.csv'
-    merged_df.to_csv(out_file, index=False)
+    with stage('merge.write_csv', rows=len(merged_df)):
+        merged_df.to_csv(out_file, index=False)
     print(f"Saved {len(merged_df)} rows to '{out_file.name}'")
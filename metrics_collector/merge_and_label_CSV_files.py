@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from fault_events import FaultIntervalIndex, events_path_for, is_events_file
+from instrumentation import stage, timed, count
+
 def parse_size(value):
     """
     Convert strings like '32K', '33M', '1T' to integer values:
@@ -32,59 +38,72 @@ def parse_size(value):
     return int(num)
 
 
-def concat_and_label(base_folder):
+# Subfolder name → label for rows hit by that folder's fault
+LABEL_MAP = {
+    'Fault_incast': 'incast',
+    'Fault_mem_contention': 'memory_contention',
+    'cpu_interference': 'cpu_interference'
+}
+DROP_COL = 'drop_pct(%)'
+FAULT_COL = 'fault'
+
+
+def label_csv(csv_path, folder_label):
     """
-    Traverse subfolders of base_folder, read all CSVs,
-    convert K/M/T suffix values, then add 'label' column:
-      - if drop_pct(%) != 0 or fault == 1 → folder's mapped fault label
+    Read one collector CSV, convert K/M/T suffix values and add a 'label'
+    column. If the collector wrote a `<name>_events.csv` fault log, rows whose
+    sample window overlaps a logged fault get folder_label. Otherwise (older
+    runs without a log):
+      - if drop_pct(%) != 0 or fault == 1 → folder_label
       - else → 'normal'
-    Finally, concatenate into one DataFrame and clean numeric columns.
     """
-    label_map = {
-        'Fault_incast': 'incast',
-        'Fault_mem_contention': 'memory_contention',
-        'cpu_interference': 'cpu_interference'
-    }
-    all_dfs = []
-    drop_col = 'drop_pct(%)'
-    fault_col = 'fault'
+    with stage('merge.read_csv', file=Path(csv_path).name):
+        df = pd.read_csv(csv_path)
+    count('files')
+    count('rows_in', len(df))
 
-    for folder in sorted(Path(base_folder).iterdir()):
-        if not folder.is_dir() or folder.name not in label_map:
-            continue
-        folder_label = label_map[folder.name]
-
-        for csv_path in sorted(folder.glob('*.csv')):
-            df = pd.read_csv(csv_path)
+    # 1) Parse K/M/T suffixes in object columns
+    for col in df.select_dtypes(include='object').columns:
+        sample = df[col].dropna().astype(str).head(5)
+        if sample.str.contains(r"[\d\.]+[KMTkmt]$").any():
+            df[col] = df[col].apply(parse_size)
 
-            # 1) Parse K/M/T suffixes in object columns
-            for col in df.select_dtypes(include='object').columns:
-                sample = df[col].dropna().astype(str).head(5)
-                if sample.str.contains(r"[\d\.]+[KMTkmt]$").any():
-                    df[col] = df[col].apply(parse_size)
+    # 2) Ensure drop_pct and fault numeric
+    if DROP_COL in df.columns:
+        df[DROP_COL] = pd.to_numeric(df[DROP_COL], errors='coerce').fillna(0)
+    if FAULT_COL in df.columns:
+        df[FAULT_COL] = pd.to_numeric(df[FAULT_COL], errors='coerce').fillna(0).astype(int)
 
-            # 2) Ensure drop_pct and fault numeric
-            if drop_col in df.columns:
-                df[drop_col] = pd.to_numeric(df[drop_col], errors='coerce').fillna(0)
-            if fault_col in df.columns:
-                df[fault_col] = pd.to_numeric(df[fault_col], errors='coerce').fillna(0).astype(int)
+    # 3) Assign labels
+    events_path = events_path_for(csv_path)
+    with stage('merge.label', file=Path(csv_path).name, rows=len(df)):
+        if events_path.exists() and 'Timestamp' in df.columns:
+            index = FaultIntervalIndex.from_csv(events_path)
+            count('fault_events', len(index))
+            hit = index.label_samples(df['Timestamp']) != 0
+        else:
+            hit = pd.Series(False, index=df.index)
+            if DROP_COL in df.columns:
+                hit |= df[DROP_COL] != 0
+            if FAULT_COL in df.columns:
+                hit |= df[FAULT_COL] == 1
+        df['label'] = np.where(hit, folder_label, 'normal')
+    return df
 
-            # 3) Assign labels
-            df['label'] = df.apply(
-                lambda row: folder_label if (row.get(drop_col,0) != 0 or row.get(fault_col,0) == 1) else 'normal',
-                axis=1
-            )
 
-            all_dfs.append(df)
-
-    # Concatenate all
+def finalize(all_dfs):
+    """
+    Concatenate labelled per-file DataFrames, drop Timestamp/fault and coerce
+    the remaining object columns (except label) to int, dropping invalid rows.
+    """
     if not all_dfs:
         return pd.DataFrame()
-    df_all = pd.concat(all_dfs, ignore_index=True)
+    with stage('merge.concat', files=len(all_dfs)):
+        df_all = pd.concat(all_dfs, ignore_index=True)
 
     # 4) Drop Timestamp & fault if present
     df_all = df_all.drop(columns=['Timestamp'], errors='ignore')
-    df_all = df_all.drop(columns=['fault'], errors='ignore')
+    df_all = df_all.drop(columns=[FAULT_COL], errors='ignore')
 
     # 5) Clean remaining object columns (except label) to numeric, drop invalid rows
     obj_cols = [c for c in df_all.select_dtypes(include='object').columns if c != 'label']
@@ -93,14 +112,34 @@ def concat_and_label(base_folder):
     df_all = df_all.dropna(subset=obj_cols)
     for col in obj_cols:
         df_all[col] = df_all[col].astype(int)
+    count('rows_out', len(df_all))
 
     return df_all
 
 
+@timed('merge.concat_and_label')
+def concat_and_label(base_folder):
+    """
+    Traverse subfolders of base_folder named in LABEL_MAP, label every CSV
+    with label_csv() and combine them with finalize().
+    """
+    all_dfs = []
+    for folder in sorted(Path(base_folder).iterdir()):
+        if not folder.is_dir() or folder.name not in LABEL_MAP:
+            continue
+        for csv_path in sorted(folder.glob('*.csv')):
+            if is_events_file(csv_path):
+                continue
+            all_dfs.append(label_csv(csv_path, LABEL_MAP[folder.name]))
+
+    return finalize(all_dfs)
+
+
 if __name__ == '__main__':
     # Use current directory as base
     BASE_FOLDER = Path.cwd()
     merged_df = concat_and_label(BASE_FOLDER)
     out_file = BASE_FOLDER / 'merged_labeled_periodic_fault_data.csv'
-    merged_df.to_csv(out_file, index=False)
+    with stage('merge.write_csv', rows=len(merged_df)):
+        merged_df.to_csv(out_file, index=False)
     print(f"Saved {len(merged_df)} rows to '{out_file.name}'")
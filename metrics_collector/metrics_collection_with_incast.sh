@@ -17,7 +17,7 @@ DUR=$3
 IFACE=$4
 DUT_PASS=123   # or prompt for it if needed
 
-OUT_CSV="/home/ranjithak/Ankit/NISMon/scripts/random_fault/${RATE}.csv"
+OUT_CSV="${OUT_CSV:-/home/ranjithak/Ankit/NISMon/scripts/random_fault/${RATE}.csv}"   # override via environment (used by sweep.py)
 FAULT_INTERVAL=5        # inject fault every 10 seconds
 VM_WORKERS=32
 VM_BYTES=4G
@@ -31,6 +31,29 @@ cat > "$OUT_CSV" <<EOF
 Timestamp,PCIRdCur,ItoM,ItoMCacheNear,WiL,MemRead,MemWrite,MemTotal,drop_pct(%),CPU_busy(%),ksoft_avg,ksoft_max,fault
 EOF
 
+# Fault event log: one row per injection, with start/end taken around the
+# fault process itself (fault code: 1=incast, 2=memory, 3=cpu)
+EVENTS_CSV="${OUT_CSV%.csv}_events.csv"
+echo "fault,start,end" > "$EVENTS_CSV"
+
+# run_fault <code> <cmd...>: run a fault in the background and log its interval
+run_fault() {
+  local code=$1; shift
+  (
+    start=$(date +"%Y-%m-%d %H:%M:%S.%N")
+    "$@" >/dev/null 2>&1 || true
+    echo "$code,$start,$(date +"%Y-%m-%d %H:%M:%S.%N")" >> "$EVENTS_CSV"
+  ) &
+}
+
+# incast_burst: $INCAST_SENDERS concurrent iperf senders, returns when all finish
+incast_burst() {
+  for ((s=1; s<=INCAST_SENDERS; s++)); do
+    iperf -c "$SERVER_IP" -p 5002 -t "$FAULT_DURATION" -P 2 >/dev/null 2>&1 &
+  done
+  wait
+}
+
 # 0) prime drop & rx counters on DUT
 set +e
 read prev_drop prev_rx < <(
@@ -54,9 +77,7 @@ for ((i=1; i<=DUR; i++)); do
       echo "[$ts] Injecting INCAST fault: launching $INCAST_SENDERS senders"
 
       # spawn $INCAST_SENDERS separate iperf clients in background
-      for ((s=1; s<=INCAST_SENDERS; s++)); do
-        iperf -c "$SERVER_IP" -p 5002 -t "$FAULT_DURATION" -P 2 >/dev/null 2>&1 &
-      done
+      run_fault 1 incast_burst
       fault=1
     fi
 
@@ -149,4 +170,5 @@ ksoft_max=${ksoft_max:-0}
 done
 
 # wait $IPERF_PID
-echo "Done: $OUT_CSV"
+wait   # let in-flight faults log their end time
+echo "Done: $OUT_CSV (fault events: $EVENTS_CSV)"
@@ -17,7 +17,7 @@ DUR=$3
 IFACE=$4
 DUT_PASS=123   # or prompt for it if needed
 
-OUT_CSV="/home/ranjithak/Ankit/NISMon/scripts/random_fault/${RATE}.csv"
+OUT_CSV="${OUT_CSV:-/home/ranjithak/Ankit/NISMon/scripts/random_fault/${RATE}.csv}"   # override via environment (used by sweep.py)
 FAULT_INTERVAL=5        # inject fault every 10 seconds
 VM_WORKERS=32
 VM_BYTES=4G
@@ -31,6 +31,29 @@ cat > "$OUT_CSV" <<EOF
 Timestamp,PCIRdCur,ItoM,ItoMCacheNear,WiL,MemRead,MemWrite,MemTotal,drop_pct(%),CPU_busy(%),ksoft_avg,ksoft_max,fault
 EOF
 
+# Fault event log: one row per injection, with start/end taken around the
+# fault process itself (fault code: 1=incast, 2=memory, 3=cpu). DUT faults
+# are timed on the DUT clock, local ones on this host's clock.
+EVENTS_CSV="${OUT_CSV%.csv}_events.csv"
+echo "fault,start,end" > "$EVENTS_CSV"
+
+# run_dut_fault <code> <remote cmd>: run a fault on the DUT in the background
+# and log its interval. start/end are read on the DUT inside the remote shell,
+# so SSH connection setup is not counted as fault time.
+run_dut_fault() {
+  local code=$1 cmd=$2
+  (
+    { read -r start; read -r end; } < <(
+      ssh "$SSH_DUT" "date +'%Y-%m-%d %H:%M:%S.%N'; $cmd >/dev/null 2>&1; date +'%Y-%m-%d %H:%M:%S.%N'"
+    ) || true
+    if [[ -n "$start" && -n "$end" ]]; then
+      echo "$code,$start,$end" >> "$EVENTS_CSV"
+    else
+      echo "warning: fault $code on $SSH_DUT not logged (ssh failed)" >&2
+    fi
+  ) &
+}
+
 # 0) prime drop & rx counters on DUT
 set +e
 read prev_drop prev_rx < <(
@@ -52,10 +75,9 @@ for ((i=1; i<=DUR; i++)); do
   # ------------- Memory Contention injection every $FAULT_INTERVAL seconds -------------
     if (( i % FAULT_INTERVAL == 0 )); then
       echo "[$ts] Injecting memory fault (stress-ng) on DUT"
-      ssh "$SSH_DUT" "echo '$DUT_PASS' | sudo -S \
+      run_dut_fault 2 "echo '$DUT_PASS' | sudo -S \
         stress-ng --vm $VM_WORKERS --vm-bytes $VM_BYTES \
-                  --vm-method $VM_METHOD --timeout 1s" \
-        >/dev/null 2>&1 &
+                  --vm-method $VM_METHOD --timeout 1s"
       fault=1
     fi
    
@@ -148,4 +170,5 @@ ksoft_max=${ksoft_max:-0}
 done
 
 # wait $IPERF_PID
-echo "Done: $OUT_CSV"
+wait   # let in-flight faults log their end time
+echo "Done: $OUT_CSV (fault events: $EVENTS_CSV)"
@@ -19,7 +19,7 @@ IFACE=$4
 DUT_PASS=123   # or prompt for it if needed
 
 # Output CSV (single combined file for all fault types)
-OUT_CSV="/home/ranjithak/Ankit/${RATE}.csv"
+OUT_CSV="${OUT_CSV:-/home/ranjithak/Ankit/${RATE}.csv}"   # override via environment (used by sweep.py)
 # Probability (percent) to inject a fault each second
 FAULT_PROB_PCT=20        # 20% chance per second
 # Incast parameters
@@ -35,6 +35,47 @@ cat > "$OUT_CSV" <<EOF
 Timestamp,PCIRdCur,ItoM,ItoMCacheNear,WiL,MemRead,MemWrite,MemTotal,drop_pct(%),CPU_busy(%),ksoft_avg,ksoft_max,fault
 EOF
 
+# Fault event log: one row per injection, with start/end taken around the
+# fault process itself (fault code: 1=incast, 2=memory, 3=cpu). DUT faults
+# are timed on the DUT clock, local ones on this host's clock.
+EVENTS_CSV="${OUT_CSV%.csv}_events.csv"
+echo "fault,start,end" > "$EVENTS_CSV"
+
+# run_fault <code> <cmd...>: run a fault in the background and log its interval
+run_fault() {
+  local code=$1; shift
+  (
+    start=$(date +"%Y-%m-%d %H:%M:%S.%N")
+    "$@" >/dev/null 2>&1 || true
+    echo "$code,$start,$(date +"%Y-%m-%d %H:%M:%S.%N")" >> "$EVENTS_CSV"
+  ) &
+}
+
+# run_dut_fault <code> <remote cmd>: run a fault on the DUT in the background
+# and log its interval. start/end are read on the DUT inside the remote shell,
+# so SSH connection setup is not counted as fault time.
+run_dut_fault() {
+  local code=$1 cmd=$2
+  (
+    { read -r start; read -r end; } < <(
+      ssh "$SSH_DUT" "date +'%Y-%m-%d %H:%M:%S.%N'; $cmd >/dev/null 2>&1; date +'%Y-%m-%d %H:%M:%S.%N'"
+    ) || true
+    if [[ -n "$start" && -n "$end" ]]; then
+      echo "$code,$start,$end" >> "$EVENTS_CSV"
+    else
+      echo "warning: fault $code on $SSH_DUT not logged (ssh failed)" >&2
+    fi
+  ) &
+}
+
+# incast_burst: $INCAST_SENDERS concurrent iperf senders, returns when all finish
+incast_burst() {
+  for ((s=1; s<=INCAST_SENDERS; s++)); do
+    iperf -c "$SERVER_IP" -p 5002 -t "$FAULT_DURATION" -P 2 >/dev/null 2>&1 &
+  done
+  wait
+}
+
 # prime drop & rx counters on DUT
 set +e
 read prev_drop prev_rx < <(
@@ -60,21 +101,17 @@ for ((i=1; i<=DUR; i++)); do
         case $fault in
             1)
                 echo "[$ts] Injecting INCAST fault"
-                for ((s=1; s<=INCAST_SENDERS; s++)); do
-                    iperf -c "$SERVER_IP" -p 5002 -t "$FAULT_DURATION" -P 2 \
-                        >/dev/null 2>&1 &
-                done
+                run_fault 1 incast_burst
                 ;;
             2)
                 echo "[$ts] Injecting MEMORY_CONTENTION fault"
-                ssh "$SSH_DUT" "echo '$DUT_PASS' | sudo -S \
+                run_dut_fault 2 "echo '$DUT_PASS' | sudo -S \
                   stress-ng --vm $VM_WORKERS --vm-bytes $VM_BYTES \
-                            --vm-method $VM_METHOD --timeout ${FAULT_DURATION}s" \
-                  >/dev/null 2>&1 &
+                            --vm-method $VM_METHOD --timeout ${FAULT_DURATION}s"
                 ;;
             3)
                 echo "[$ts] Injecting CPU_INTERFERENCE fault"
-                ssh "$SSH_DUT" "echo '$DUT_PASS' | sudo -S taskset -c 20-39,60-79 chrt -f 99 stress-ng --cpu 40 --timeout ${FAULT_DURATION}s" >/dev/null 2>&1 &
+                run_dut_fault 3 "echo '$DUT_PASS' | sudo -S taskset -c 20-39,60-79 chrt -f 99 stress-ng --cpu 40 --timeout ${FAULT_DURATION}s"
                 ;;
         esac
     fi
@@ -138,4 +175,5 @@ for ((i=1; i<=DUR; i++)); do
 
 done
 
-echo "Done: $OUT_CSV"
+wait   # let in-flight faults log their end time
+echo "Done: $OUT_CSV (fault events: $EVENTS_CSV)"
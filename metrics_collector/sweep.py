@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Pipelined bandwidth sweep: the Python counterpart of common.sh.
+
+For each bandwidth in BWS the sweep starts background iperf traffic plus a
+metrics collector, exactly like common.sh. Differences:
+
+  * Every finished run is recorded in <out-dir>/sweep_checkpoint.json, so an
+    interrupted sweep resumes at the next unfinished bandwidth.
+  * While the next bandwidth is being collected, a background worker labels
+    the runs that already finished (label_csv from merge_and_label_CSV_files),
+    so only the final concat and the optional training command remain once
+    the last sample is written.
+
+Collector CSVs land in <out-dir>/<scenario folder>/<BW>.csv (the layout that
+merge_and_label_CSV_files.py expects) via the collectors' OUT_CSV variable.
+
+Usage:
+  python sweep.py --scenario incast --out-dir sweep_incast \
+      --train-cmd 'python ../../classifier_model_scripts/random_forest_model.py'
+
+  # local dry run with the fake iperf / collector used by tests/test_sweep.py
+  python sweep.py --scenario incast --out-dir /tmp/sweep --dur 3 --metric-dur 2 \
+      --iperf tests/fake_iperf.sh --collector tests/fake_collector.sh
+
+--train-cmd runs inside --out-dir with `--input <merged CSV>` appended, so
+relative paths in it resolve from --out-dir.
+"""
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from merge_and_label_CSV_files import LABEL_MAP, label_csv, finalize
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'evaluation_scripts'))
+from instrumentation import stage
+
+HERE = Path(__file__).resolve().parent
+
+# ─── Defaults (mirror common.sh) ─────────────────────────────────────────────
+SSH_DUT = 'netx4'
+DUR = 2500                                          # test duration (s)
+BWS = ['2.5G', '3.75G', '5G', '6.25G', '7.5G', '8.75G', '10G']
+IPERF_PARALLEL = 4                                  # TCP streams per test
+SERVER_IP = '30.0.0.2'                              # DUT's NIC IP
+IFACE_STATS = 'ens802np1np1'                        # interface to sample drops/stats
+METRIC_DUR = 600                                    # collector duration (s)
+
+# scenario → (collector script, LABEL_MAP folder)
+SCENARIOS = {
+    'incast': ('metrics_collection_with_incast.sh', 'Fault_incast'),
+    'memory_contention': ('metrics_collection_with_memory_contention.sh', 'Fault_mem_contention'),
+    'cpu_interference': ('metrics_collection_with_CPU_interference.sh', 'cpu_interference'),
+}
+
+# ─── Checkpoint ──────────────────────────────────────────────────────────────
+class Checkpoint:
+    """
+    Per-bandwidth run state, persisted as JSON after every change:
+      collected → collector finished and its CSV is complete
+      labeled   → labelled DataFrame pickled next to the CSV
+    Writes go through a temp file + os.replace, so a crash never leaves a
+    half-written checkpoint.
+    """
+
+    def __init__(self, path, scenario):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path) as f:
+                self.state = json.load(f)
+            if self.state.get('scenario') != scenario:
+                raise ValueError(f"{self.path} belongs to scenario "
+                                 f"'{self.state.get('scenario')}', not '{scenario}'")
+        else:
+            self.state = {'scenario': scenario, 'runs': {}}
+
+    def status(self, bw):
+        with self._lock:
+            return self.state['runs'].get(bw, {}).get('status')
+
+    def run(self, bw):
+        with self._lock:
+            return dict(self.state['runs'].get(bw, {}))
+
+    def update(self, bw, **fields):
+        with self._lock:
+            self.state['runs'].setdefault(bw, {}).update(fields)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp, self.path)
+
+# ─── Stages ──────────────────────────────────────────────────────────────────
+def _stop(proc, timeout=10):
+    """Terminate a child and its process group if it is still running."""
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+
+def collect(bw, args, csv_path):
+    """
+    Run iperf traffic + collector for one bandwidth; raise if either fails.
+    If the collector fails or the sweep is interrupted, the iperf client is
+    stopped instead of being left to run out its --dur.
+    """
+    collector = args.collector or str(HERE / SCENARIOS[args.scenario][0])
+    env = dict(os.environ, OUT_CSV=str(csv_path))
+
+    print(f"=== Run: iperf2 @ {bw} total across {args.parallel} streams for {args.dur} s ===")
+    with stage('sweep.collect', bw=bw):
+        # own process groups, so _stop() also reaches their children
+        client = subprocess.Popen(
+            shlex.split(args.iperf) + ['-c', args.server_ip, '-p', '5001', '-t', str(args.dur),
+                                       '-P', str(args.parallel), '-b', bw],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        try:
+            monitor = subprocess.Popen(
+                shlex.split(collector) + [args.ssh_dut, bw, str(args.metric_dur), args.iface],
+                env=env, start_new_session=True)
+            try:
+                monitor_rc = monitor.wait()
+            finally:
+                _stop(monitor)
+            if monitor_rc != 0:
+                raise RuntimeError(f"collector exited with {monitor_rc} at {bw}")
+            client_rc = client.wait()
+        finally:
+            _stop(client)
+
+    if client_rc != 0:
+        raise RuntimeError(f"iperf exited with {client_rc} at {bw}")
+    print(f">>> Completed run at {bw} <<<")
+
+
+def label_run(bw, csv_path, folder_label, checkpoint):
+    """Background job: label one finished run and pickle the result."""
+    with stage('sweep.label', bw=bw):
+        df = label_csv(csv_path, folder_label)
+        pkl_path = csv_path.with_suffix('.labeled.pkl')
+        df.to_pickle(pkl_path)
+    checkpoint.update(bw, status='labeled', labeled=str(pkl_path))
+    return pkl_path
+
+
+def sweep(args):
+    out_dir = Path(args.out_dir)
+    folder = SCENARIOS[args.scenario][1]
+    run_dir = out_dir / folder
+    run_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = Checkpoint(out_dir / 'sweep_checkpoint.json', args.scenario)
+
+    pending = []
+    with ThreadPoolExecutor(max_workers=1) as labeler:
+        for bw in args.bws:
+            csv_path = run_dir / f'{bw}.csv'
+            status = checkpoint.status(bw)
+            if status == 'labeled':
+                print(f"--- {bw}: already collected and labelled, skipping")
+                continue
+            if status != 'collected':
+                collect(bw, args, csv_path)
+                checkpoint.update(bw, status='collected', csv=str(csv_path),
+                                  finished_at=time.time())
+            else:
+                print(f"--- {bw}: already collected, labelling only")
+            pending.append(labeler.submit(label_run, bw, csv_path, LABEL_MAP[folder], checkpoint))
+
+        last_sample = time.perf_counter()
+        for fut in pending:
+            fut.result()   # re-raise labelling errors
+
+    with stage('sweep.finalize', runs=len(args.bws)):
+        dfs = [pd.read_pickle(checkpoint.run(bw)['labeled']) for bw in args.bws]
+        merged = finalize(dfs)
+        out_file = out_dir / args.output
+        merged.to_csv(out_file, index=False)
+    print(f"Saved {len(merged)} rows to '{out_file}'")
+
+    if args.train_cmd:
+        train_cmd = f"{args.train_cmd} --input {shlex.quote(str(out_file.resolve()))}"
+        with stage('sweep.train'):
+            subprocess.run(train_cmd, shell=True, cwd=out_dir, check=True)
+    print(f"Last sample → {'trained model' if args.train_cmd else 'merged CSV'} "
+          f"in {time.perf_counter() - last_sample:.1f} s")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Checkpointed, pipelined bandwidth sweep.")
+    p.add_argument('--scenario', choices=sorted(SCENARIOS), required=True)
+    p.add_argument('--out-dir', type=Path, default=Path.cwd())
+    p.add_argument('--output', default='merged_labeled_periodic_fault_data.csv',
+                   help="merged CSV name inside --out-dir (default: %(default)s)")
+    p.add_argument('--bws', nargs='+', default=BWS)
+    p.add_argument('--dur', type=int, default=DUR)
+    p.add_argument('--metric-dur', type=int, default=METRIC_DUR)
+    p.add_argument('--parallel', type=int, default=IPERF_PARALLEL)
+    p.add_argument('--ssh-dut', default=SSH_DUT)
+    p.add_argument('--server-ip', default=SERVER_IP)
+    p.add_argument('--iface', default=IFACE_STATS)
+    p.add_argument('--iperf', default='iperf', help="iperf command (default: %(default)s)")
+    p.add_argument('--collector', help="collector command (default: the scenario's script)")
+    p.add_argument('--train-cmd',
+                   help="trainer command run in --out-dir after the merge; "
+                        "'--input <merged CSV>' is appended")
+    return p.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sweep(parse_args())
@@ -0,0 +1,11 @@
+#!/usr/bin/env bash
+# Stand-in for metrics_collection_with_*.sh: same args (SSH_DUT RATE DUR IFACE),
+# writes a small CSV to $OUT_CSV. Exits 3 when RATE == $FAIL_AT and appends
+# each collected RATE to $COLLECT_LOG.
+[[ -n "$FAIL_AT" && "$2" == "$FAIL_AT" ]] && exit 3
+[[ -n "$COLLECT_LOG" ]] && echo "$2" >> "$COLLECT_LOG"
+echo "Timestamp,PCIRdCur,ItoM,ItoMCacheNear,WiL,MemRead,MemWrite,MemTotal,drop_pct(%),CPU_busy(%),ksoft_avg,ksoft_max,fault" > "$OUT_CSV"
+for ((i=0; i<20; i++)); do
+  f=$(( i % 5 == 4 ? 1 : 0 ))
+  echo "2025-01-01 00:00:$(printf '%02d' $i),424K,51M,3540K,256K,8205.6,12476.8,20682.4,0.0,4.7,16.9,37.3,$f" >> "$OUT_CSV"
+done
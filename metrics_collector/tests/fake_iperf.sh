@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+# Stand-in for the iperf client: sleeps for the -t duration, sends nothing.
+dur=1
+while [[ $# -gt 0 ]]; do
+  [[ "$1" == "-t" ]] && dur=$2
+  shift
+done
+exec sleep "$dur"
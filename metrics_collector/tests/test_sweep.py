@@ -0,0 +1,48 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+import sweep  # noqa: E402
+
+BWS = ['2.5G', '5G', '10G']
+
+
+def _args(out_dir, bws=BWS, dur=1):
+    return sweep.parse_args([
+        '--scenario', 'incast', '--out-dir', str(out_dir), '--bws', *bws,
+        '--dur', str(dur), '--metric-dur', '1',
+        '--iperf', str(HERE / 'fake_iperf.sh'),
+        '--collector', str(HERE / 'fake_collector.sh'),
+    ])
+
+
+def test_collector_failure_stops_client(tmp_path, monkeypatch):
+    monkeypatch.setenv('FAIL_AT', '5G')
+    t0 = time.perf_counter()
+    with pytest.raises(RuntimeError, match='collector exited with 3 at 5G'):
+        sweep.sweep(_args(tmp_path, bws=['5G'], dur=60))
+    assert time.perf_counter() - t0 < 15   # not the 60 s --dur
+
+
+def test_resume_collects_only_unfinished(tmp_path, monkeypatch):
+    log = tmp_path / 'collected.log'
+    monkeypatch.setenv('COLLECT_LOG', str(log))
+
+    monkeypatch.setenv('FAIL_AT', '5G')
+    with pytest.raises(RuntimeError):
+        sweep.sweep(_args(tmp_path))
+    assert log.read_text().split() == ['2.5G']
+    assert not (tmp_path / 'merged_labeled_periodic_fault_data.csv').exists()
+
+    monkeypatch.delenv('FAIL_AT')
+    log.unlink()
+    sweep.sweep(_args(tmp_path))
+    assert log.read_text().split() == ['5G', '10G']
+
+    checkpoint = sweep.Checkpoint(tmp_path / 'sweep_checkpoint.json', 'incast')
+    assert all(checkpoint.status(bw) == 'labeled' for bw in BWS)
+    assert (tmp_path / 'merged_labeled_periodic_fault_data.csv').exists()